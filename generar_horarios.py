@@ -1,34 +1,134 @@
+import numpy as np
 import pandas as pd
 import os
+import logging
 from typing import Dict, List, Tuple # Para mantener la consistencia de los datos
 
+# Escritores de Excel: xlsxwriter es opcional (mas rapido) y openpyxl se usa si no esta instalado
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, NamedStyle
+    from openpyxl.styles.fonts import DEFAULT_FONT
+    from openpyxl.utils import get_column_letter
+    _OPENPYXL_DISPONIBLE = True
+except ImportError:
+    _OPENPYXL_DISPONIBLE = False
+
+# Los mensajes de progreso se emiten por logging; main configura su salida
+logger = logging.getLogger(__name__)
+
 class GeneradorHorariosLaboratorio:
-    def __init__(self, mapeo_laboratorios: Dict[str, str], dias: List[str], franjas_horarias: List[str], columnas_entrada: List[str]):
-        self.mapeo_laboratorios = mapeo_laboratorios
+    # Columnas del reporte que se usan para generar el horario, el resto no se carga
+    columnas_utilizadas = ['Día', 'Hora', 'Asignatura', 'Grupo', 'Proyecto', 'Salón', 'Edificio', 'Inscritos', 'Docente']
+    
+    # Color de relleno de cada tipo de fila del horario de salida (verde y azul se alternan por pares de franjas)
+    colores_filas = {'encabezado': '2f2f2f', 'separador': '2f2f2f', 'verde': 'e2efda', 'azul': 'b4c6e7'}
+    
+    def __init__(self, mapeo_laboratorios: Dict[str, str], dias: List[str], franjas_horarias: List[str], columnas_entrada: List[str], verbose: bool = False, orden_laboratorios: List[str] = None):
         self.dias = dias
         self.franjas_horarias = franjas_horarias
         self.columnas_entrada = columnas_entrada
+        self.verbose = verbose # Mostrar diagnosticos detallados (mapeo, laboratorios encontrados y excluidos)
+        self.orden_laboratorios = orden_laboratorios # Orden manual de los laboratorios en el horario (opcional)
+        
+        # Posicion de cada franja horaria para consultas en tiempo constante
+        self._indice_franja = {franja: i for i, franja in enumerate(franjas_horarias)}
+        
+        # Fila de cada (dia, franja) en la matriz del horario: cada dia ocupa sus franjas mas una fila de separacion
+        self._fila_horario = {
+            (dia, franja): i * (len(franjas_horarias) + 1) + j
+            for i, dia in enumerate(dias)
+            for j, franja in enumerate(franjas_horarias)
+        }
+        
+        self.actualizar_mapeo_laboratorios(mapeo_laboratorios)
+
+    def actualizar_mapeo_laboratorios(self, mapeo_laboratorios: Dict[str, str]):
+        '''
+        Cambia el mapeo de laboratorios y recalcula los datos que se derivan de él.
+        Se debe usar en lugar de modificar 'mapeo_laboratorios' directamente.
+        '''
+        self.mapeo_laboratorios = mapeo_laboratorios
+        
+        # Laboratorios de origen como conjunto para filtrar con isin
+        self._laboratorios_origen = frozenset(mapeo_laboratorios)
+        
+        # Laboratorios unicos de salida en el orden manual si se definio, si no en el orden en que aparecen en el mapeo
+        if self.orden_laboratorios is not None:
+            self._laboratorios_salida = list(self.orden_laboratorios)
+        else:
+            self._laboratorios_salida = list(dict.fromkeys(mapeo_laboratorios.values()))
+        
+        # Columnas de la matriz del horario: Dia, Hora, luego pares para cada laboratorio (Asignatura, Grupo)
+        self._columnas_horario = ['Dia', 'Hora']
+        for lab in self._laboratorios_salida:
+            self._columnas_horario.extend([f'{lab}_asignatura', f'{lab}_grupo'])
+        
+        # Posicion de la columna de asignatura de cada laboratorio de origen en la matriz del horario (la de grupo es la
+        # siguiente): tras Dia y Hora, cada laboratorio de salida ocupa dos columnas. -1 si no esta en el orden manual
+        posicion_salida = {lab: 2 + 2 * i for i, lab in enumerate(self._laboratorios_salida)}
+        self._columna_laboratorio = {origen: posicion_salida.get(destino, -1) for origen, destino in mapeo_laboratorios.items()}
 
-    def leer_reporte_ocupacion(self, ruta_archivo: str) -> pd.DataFrame: # La flecha indica que debe retornar un objeto de tipo DataFrame
+    def leer_reporte_ocupacion(self, ruta_archivo: str, nrows: int = None) -> pd.DataFrame: # La flecha indica que debe retornar un objeto de tipo DataFrame
         '''
-        Esta funcion lee el reporte de las clases y retorna un DataFrame con todos los datos que contenga.
+        Esta funcion lee el reporte de las clases y retorna un DataFrame con las columnas que se usan para generar el horario,
+        solo con los registros de laboratorios que están en el mapeo.
+        Con 'nrows' solo se leen los primeros registros del reporte (util para pruebas con reportes grandes).
         '''
         try:
             if not os.path.exists(ruta_archivo):
                 raise FileNotFoundError(f'Archivo no encontrado: {ruta_archivo}\n')
 
-            df = pd.read_excel(ruta_archivo)
+            # Preferir calamine (lector compilado en Rust, pandas >= 2.2 con python-calamine); si no esta disponible usar openpyxl
+            try:
+                libro = pd.ExcelFile(ruta_archivo, engine='calamine')
+            except (ImportError, ValueError):
+                # Solo se consumen los valores de las celdas, asi que se abre el libro sin estilos ni formulas
+                libro = pd.ExcelFile(ruta_archivo, engine='openpyxl', engine_kwargs={'read_only': True, 'data_only': True})
             
-            # Validar que el numero de columnas sea el esperado
-            if len(df.columns) != len(self.columnas_entrada):
-                print(f'Advertencia: Se esperaban {len(self.columnas_entrada)} columnas, pero se encontraron {len(df.columns)}')
-                print(f'Esperadas: {self.columnas_entrada}')
-                print(f'Encontradas: {list(df.columns)}')
+            with libro:
+                # Leer solo el encabezado para validar el numero de columnas sin cargar los datos
+                encabezado = libro.parse(nrows=0)
+                
+                # Validar que el numero de columnas sea el esperado
+                if len(encabezado.columns) != len(self.columnas_entrada):
+                    logger.warning(f'Advertencia: Se esperaban {len(self.columnas_entrada)} columnas, pero se encontraron {len(encabezado.columns)}')
+                    logger.warning(f'Esperadas: {self.columnas_entrada}')
+                    logger.warning(f'Encontradas: {list(encabezado.columns)}')
+                
+                # Leer unicamente las columnas que usa el resto del proceso (por posicion, como al renombrar)
+                columnas_archivo = self.columnas_entrada[:len(encabezado.columns)]
+                posiciones_utilizadas = [i for i, columna in enumerate(columnas_archivo) if columna in self.columnas_utilizadas]
+                df = libro.parse(usecols=posiciones_utilizadas, nrows=nrows)
             
             # Renombrar columnas para que coincidan con los nombres esperados
-            df.columns = self.columnas_entrada[:len(df.columns)]
+            df.columns = [columnas_archivo[i] for i in posiciones_utilizadas]
+            total_registros = len(df)
+            
+            # Descartar de inmediato los registros de salones que no estan en el mapeo: nunca llegan al horario
+            # y asi las conversiones siguientes trabajan solo con los registros utiles
+            if 'Salón' in df.columns:
+                df = df[df['Salón'].isin(self._laboratorios_origen)].reset_index(drop=True)
+            
+            # Las columnas de texto se repiten mucho entre registros: como categorias ocupan menos memoria y el filtrado
+            # y la agrupacion trabajan sobre codigos enteros en lugar de cadenas
+            columnas_categoricas = ('Día', 'Hora', 'Asignatura', 'Grupo', 'Proyecto', 'Salón', 'Edificio', 'Docente')
+            df = df.astype({columna: 'category' for columna in columnas_categoricas if columna in df.columns})
             
-            print(f'Se cargaron exitosamente {len(df)} registros desde {ruta_archivo}\n')
+            # Normalizar el edificio a mayusculas una sola vez; en una categoria solo se convierte cada valor distinto
+            if 'Edificio' in df.columns:
+                df['Edificio'] = df['Edificio'].map(lambda edificio: str(edificio).upper(), na_action='ignore').astype('category')
+            
+            if 'Inscritos' in df.columns and pd.api.types.is_integer_dtype(df['Inscritos']):
+                df['Inscritos'] = df['Inscritos'].astype('int32')
+            
+            logger.info(f'Se cargaron exitosamente {total_registros} registros desde {ruta_archivo} ({len(df)} de laboratorios mapeados)\n')
             return df
             
         except Exception as e:
@@ -37,198 +137,177 @@ class GeneradorHorariosLaboratorio:
     def filtrar_laboratorios_mapeados(self, df: pd.DataFrame) -> pd.DataFrame:
         '''
         Esta funcion filtra el dataframe para incluir solo los laboratorios que están en la lista de laboratorios y en el edificio TECHNE.
+        Espera el edificio ya en mayusculas, como lo deja 'leer_reporte_ocupacion'.
         '''
-        laboratorios_mapeados = list(self.mapeo_laboratorios.keys())
+        es_laboratorio_mapeado = df['Salón'].isin(self._laboratorios_origen)
+        es_edificio_techne = df['Edificio'] == 'TECHNE'
         
-        # Filtrar por mapeo de laboratorios Y edificio TECHNE
-        df_filtrado = df[
-            (df['Salón'].isin(laboratorios_mapeados)) & 
-            (df['Edificio'].str.upper() == 'TECHNE')
-        ].copy()
+        # Filtrar por mapeo de laboratorios Y edificio TECHNE, conservando solo las columnas que se usan despues
+        # (el edificio ya no se necesita una vez filtrado)
+        columnas_clases = [columna for columna in df.columns if columna != 'Edificio']
+        df_filtrado = df.loc[es_laboratorio_mapeado & es_edificio_techne, columnas_clases]
         
-        print(f'___\nSe filtraron {len(df_filtrado)} registros para los laboratorios mapeados en el edificio TECHNE\n')
-        print(f'Laboratorios mapeados encontrados: {df_filtrado['Salón'].unique().tolist()}\n___\n')
+        logger.info(f'___\nSe filtraron {len(df_filtrado)} registros para los laboratorios mapeados en el edificio TECHNE\n')
         
-        # Mostrar laboratorios excluidos por el filtro de edificio
-        todos_los_labs_mapeados = df[df['Salón'].isin(laboratorios_mapeados)]
-        excluidos_por_edificio = todos_los_labs_mapeados[todos_los_labs_mapeados['Edificio'].str.upper() != 'TECHNE']
+        # Los diagnosticos detallados recorren de nuevo los registros, por eso solo se calculan en modo verbose
+        # y si el nivel de logging va a mostrarlos
+        mostrar_diagnosticos = self.verbose and logger.isEnabledFor(logging.INFO)
+        if mostrar_diagnosticos:
+            logger.info(f'Laboratorios mapeados encontrados: {df_filtrado['Salón'].unique().tolist()}')
+        logger.info('___\n')
         
-        # Solo muestra el mensaje mientras que la lista no este vacia
-        if not excluidos_por_edificio.empty:
-            labs_excluidos = excluidos_por_edificio['Salón'].unique().tolist()
-            print(f'Laboratorios excluidos (no están en el edificio TECHNE): {labs_excluidos}\n')
+        if mostrar_diagnosticos:
+            # Mostrar laboratorios excluidos por el filtro de edificio, reutilizando las mascaras anteriores
+            excluidos_por_edificio = df.loc[es_laboratorio_mapeado & ~es_edificio_techne, 'Salón']
+            
+            # Solo muestra el mensaje mientras que la lista no este vacia
+            if not excluidos_por_edificio.empty:
+                labs_excluidos = excluidos_por_edificio.unique().tolist()
+                logger.info(f'Laboratorios excluidos (no están en el edificio TECHNE): {labs_excluidos}\n')
         
         return df_filtrado
 
-    def agrupar_horas_consecutivas(self, df: pd.DataFrame) -> List[Dict]: # Retorna lista de diccionarios de sesiones de clase
+    def agrupar_horas_consecutivas(self, df: pd.DataFrame) -> pd.DataFrame: # Retorna un DataFrame con una fila por sesion de clase
         '''
         Esta funcion agrupa las entradas de horas consecutivas en sesiones de clase únicas.
         También maneja clases de una sola hora y clases no consecutivas.
         '''
-        clases = []
-        
         # Agrupar por todos los campos excepto la hora
         campos_agrupacion = ['Día', 'Asignatura', 'Grupo', 'Proyecto', 'Salón', 'Docente']
-        agrupado = df.groupby(campos_agrupacion)
         
-        for clave_grupo, df_grupo in agrupado:
-            # Ordenar por hora para asegurar un orden consecutivo adecuado
-            df_grupo = df_grupo.sort_values('Hora')
-            horas = df_grupo['Hora'].tolist()
-            horas_procesadas = set()
-            
-            # Encontrar primero los pares consecutivos
-            i = 0
-            while i < len(horas) - 1:
-                if horas[i] in horas_procesadas:
-                    i += 1
-                    continue
-                    
-                hora_actual = horas[i]
-                hora_siguiente = horas[i + 1]
-                
-                # Verificar si son horas consecutivas
-                if self.son_horas_consecutivas(hora_actual, hora_siguiente):
-                    info_clase = {
-                        'dia': clave_grupo[0],
-                        'hora_inicio': hora_actual,
-                        'hora_fin': hora_siguiente,
-                        'asignatura': clave_grupo[1],
-                        'grupo': clave_grupo[2],
-                        'proyecto': clave_grupo[3],
-                        'laboratorio': clave_grupo[4],
-                        'docente': clave_grupo[5],
-                        'inscritos': df_grupo.iloc[0]['Inscritos'],  # Obtener el número de inscritos
-                        'es_de_dos_horas': True
-                    }
-                    clases.append(info_clase)
-                    horas_procesadas.add(hora_actual)
-                    horas_procesadas.add(hora_siguiente)
-                    i += 2  # Saltar la siguiente hora ya que ha sido procesada
-                else:
-                    i += 1
-            
-            # Manejar las horas restantes (clases de una hora o no consecutivas)
-            for hora in horas:
-                if hora not in horas_procesadas:
-                    info_clase = {
-                        'dia': clave_grupo[0],
-                        'hora_inicio': hora,
-                        'hora_fin': None,
-                        'asignatura': clave_grupo[1],
-                        'grupo': clave_grupo[2],
-                        'proyecto': clave_grupo[3],
-                        'laboratorio': clave_grupo[4],
-                        'docente': clave_grupo[5],
-                        'inscritos': df_grupo[df_grupo['Hora'] == hora].iloc[0]['Inscritos'],  # Obtener inscritos para esta hora
-                        'es_de_dos_horas': False
-                    }
-                    clases.append(info_clase)
-        
-        print(f'Se encontraron {len(clases)} sesiones de clase (incluyendo clases de una hora)\n')
+        # Igual que en un groupby, se descartan los registros con campos de agrupación vacíos
+        df = df.dropna(subset=campos_agrupacion)
+        
+        # Convertir cada hora en su posición dentro de las franjas horarias (-1 si no pertenece a ninguna)
+        franja = df['Hora'].map(self._indice_franja).astype('float64').fillna(-1).astype('int16')
+        
+        # Numerar los grupos sin ordenar sus claves y sin generar combinaciones de categorias que no aparecen
+        grupo = df.groupby(campos_agrupacion, sort=False, observed=True).ngroup().to_numpy()
+        
+        # Ordenar por grupo y franja para que las horas de cada grupo queden contiguas y en orden cronológico
+        orden = np.lexsort((franja.to_numpy(), grupo))
+        df = df.iloc[orden]
+        es_inicio_par, es_fin_par = self.emparejar_franjas(grupo[orden], franja.to_numpy()[orden])
+        
+        df_clases = pd.DataFrame({
+            'dia': df['Día'],
+            'hora_inicio': df['Hora'],
+            'hora_fin': df['Hora'].shift(-1).where(es_inicio_par, None),
+            'asignatura': df['Asignatura'],
+            'grupo': df['Grupo'],
+            'proyecto': df['Proyecto'],
+            'laboratorio': df['Salón'],
+            'docente': df['Docente'],
+            'inscritos': df['Inscritos'],
+            'es_de_dos_horas': es_inicio_par
+        })
+        
+        # Las filas que cierran un par ya quedaron incluidas en la clase de dos horas
+        clases = df_clases[~es_fin_par].reset_index(drop=True)
+        
+        logger.info(f'Se encontraron {len(clases)} sesiones de clase (incluyendo clases de una hora)\n')
         return clases
 
+    @staticmethod
+    def emparejar_franjas(grupo: np.ndarray, franja: np.ndarray) -> Tuple[np.ndarray, np.ndarray]: # Mascaras de inicio y fin de las clases de dos horas
+        '''
+        Recibe el codigo de grupo y la posicion de franja de cada registro, ordenados por grupo y franja (-1 si la hora no
+        pertenece a las franjas), y empareja las horas consecutivas de cada grupo de dos en dos en una sola pasada.
+        Si un tramo de horas consecutivas es impar, la ultima hora queda como clase de una hora.
+        '''
+        # Una fila continúa a la anterior si pertenece al mismo grupo y ocupa la franja siguiente
+        mismo_grupo = grupo == np.roll(grupo, 1)
+        mismo_grupo[:1] = False
+        franja_anterior = np.roll(franja, 1)
+        es_consecutiva = mismo_grupo & (franja_anterior >= 0) & (franja == franja_anterior + 1)
+        
+        # Posición de cada fila dentro de su tramo de horas consecutivas
+        posiciones = np.arange(len(franja))
+        inicio_tramo = np.maximum.accumulate(np.where(es_consecutiva, 0, posiciones))
+        posicion_en_tramo = posiciones - inicio_tramo
+        
+        # Una fila abre un par si ocupa una posicion par de su tramo y la siguiente fila continua el tramo
+        siguiente_es_consecutiva = np.roll(es_consecutiva, -1)
+        siguiente_es_consecutiva[-1:] = False
+        es_inicio_par = (posicion_en_tramo % 2 == 0) & siguiente_es_consecutiva
+        es_fin_par = np.roll(es_inicio_par, 1)
+        es_fin_par[:1] = False
+        
+        return es_inicio_par, es_fin_par
+
     def son_horas_consecutivas(self, hora1: str, hora2: str) -> bool:
         '''
         Esta funcion verifica si dos horas son consecutivas en las franjas horarias.
-        Es utilizada por la funcion 'agrupar_horas_consecutivas'.
         '''
-        try:
-            idx1 = self.franjas_horarias.index(hora1)
-            idx2 = self.franjas_horarias.index(hora2)
-            return idx2 == idx1 + 1
-        except ValueError:
-            return False
+        idx1 = self._indice_franja.get(hora1)
+        idx2 = self._indice_franja.get(hora2)
+        return idx1 is not None and idx2 == idx1 + 1
 
-    def crear_matriz_horario(self, clases: List[Dict]) -> pd.DataFrame: # añadir 'orden_laboratorios: List[str]' como argumento para organizacion manual
+    def crear_matriz_horario(self, clases: pd.DataFrame) -> pd.DataFrame:
         '''
         La funcion crea la matriz de horario de salida con la estructura que debe tener el horario final.
         '''
-        # Obtener laboratorios unicos del mapeo (nombres de salida), eliminar para ordenar de manera manual los laboratorios
-        laboratorios_salida = sorted(list(set(self.mapeo_laboratorios.values())))
-        
-        # OPCIONAL: para definir en que orden se organizaran los laboratorios en el horario final
-        # laboratorios_salida = self.orden_laboratorios
-        
-        # Crear columnas: Dia, Hora, luego pares para cada laboratorio (Asignatura, Grupo)
-        columnas = ['Dia', 'Hora']
-        for lab in laboratorios_salida:
-            columnas.extend([f'{lab}_asignatura', f'{lab}_grupo'])
-        
-        # Crear filas para cada día y franja horaria, más filas de separación
-        filas = []
-        for i, dia in enumerate(self.dias):
-            for franja in self.franjas_horarias:
-                fila = {'Dia': dia, 'Hora': franja}
-                # Inicializar todas las columnas de laboratorio como vacías
-                for lab in laboratorios_salida:
-                    fila[f'{lab}_asignatura'] = ''
-                    fila[f'{lab}_grupo'] = ''
-                filas.append(fila)
-            
-            # Añadir fila de separación después de cada día (excepto el último)
-            if i < len(self.dias) - 1:
-                fila_separadora = {'Dia': '', 'Hora': ''}
-                for lab in laboratorios_salida:
-                    fila_separadora[f'{lab}_asignatura'] = ''
-                    fila_separadora[f'{lab}_grupo'] = ''
-                filas.append(fila_separadora)
-        
-        # Crear el dataframe base
-        df_horario = pd.DataFrame(filas, columns=columnas)
-        
-        # Rellenar la información de las clases
-        for info_clase in clases:
-            dia = info_clase['dia']
-            hora_inicio = info_clase['hora_inicio']
-            
-            # Mapear nombre de laboratorio a nombre de salida
-            laboratorio_salida = self.mapeo_laboratorios.get(info_clase['laboratorio'])
-            if not laboratorio_salida:
-                continue
-            
-            # Crear grupo con información de inscritos
-            grupo_con_inscritos = f'{info_clase['grupo']} | Inscritos: {info_clase['inscritos']}'
-            
-            if info_clase['es_de_dos_horas']:
-                # Clase de dos horas: formato tradicional
-                hora_fin = info_clase['hora_fin']
-                
-                # Primera hora: Asignatura en la primera columna, Grupo con inscritos en la segunda
-                mascara_inicio = (df_horario['Dia'] == dia) & (df_horario['Hora'] == hora_inicio)
-                if mascara_inicio.any():
-                    idx = df_horario[mascara_inicio].index[0]
-                    df_horario.loc[idx, f'{laboratorio_salida}_asignatura'] = info_clase['asignatura']
-                    df_horario.loc[idx, f'{laboratorio_salida}_grupo'] = grupo_con_inscritos
-                
-                # Segunda hora: Docente en la primera columna, Proyecto en la segunda
-                mascara_fin = (df_horario['Dia'] == dia) & (df_horario['Hora'] == hora_fin)
-                if mascara_fin.any():
-                    idx = df_horario[mascara_fin].index[0]
-                    df_horario.loc[idx, f'{laboratorio_salida}_asignatura'] = info_clase['docente']
-                    df_horario.loc[idx, f'{laboratorio_salida}_grupo'] = info_clase['proyecto']
-            else:
-                # Clase de una hora: poner asignatura y grupo en la primera fila
-                mascara_inicio = (df_horario['Dia'] == dia) & (df_horario['Hora'] == hora_inicio)
-                if mascara_inicio.any():
-                    idx = df_horario[mascara_inicio].index[0]
-                    df_horario.loc[idx, f'{laboratorio_salida}_asignatura'] = info_clase['asignatura']
-                    df_horario.loc[idx, f'{laboratorio_salida}_grupo'] = grupo_con_inscritos
-        
-        return df_horario
+        # Columnas precalculadas a partir del mapeo: Dia, Hora y los pares de cada laboratorio de salida
+        columnas = self._columnas_horario
+        
+        # Crear filas para cada día y franja horaria, más una fila de separación después de cada día (excepto el último)
+        n_franjas = len(self.franjas_horarias)
+        n_filas = max(len(self.dias) * (n_franjas + 1) - 1, 0)
+        dias_filas = np.repeat(np.array(self.dias, dtype=object), n_franjas)
+        franjas_filas = np.tile(np.array(self.franjas_horarias, dtype=object), len(self.dias))
+        posiciones_datos = (np.arange(len(self.dias))[:, None] * (n_franjas + 1) + np.arange(n_franjas)).ravel()
+        
+        # Inicializar todas las celdas como vacías y escribir Dia y Hora solo en las filas de datos.
+        # El orden por columnas (F) coincide con como pandas guarda el bloque, asi el DataFrame final no copia los datos
+        valores = np.full((n_filas, len(columnas)), '', dtype=object, order='F')
+        valores[posiciones_datos, 0] = dias_filas
+        valores[posiciones_datos, 1] = franjas_filas
+        
+        if clases.empty:
+            return pd.DataFrame(valores, columns=columnas, copy=False)
+        
+        # Descartar las clases de laboratorios sin mapeo
+        df_clases = clases[clases['laboratorio'].isin(self._laboratorios_origen)]
+        
+        # Posicion de la fila de inicio y de fin de cada clase (-1 si no existe en el horario)
+        fila_inicio = np.array([self._fila_horario.get(clave, -1) for clave in zip(df_clases['dia'], df_clases['hora_inicio'])], dtype=np.intp)
+        fila_fin = np.array([self._fila_horario.get(clave, -1) for clave in zip(df_clases['dia'], df_clases['hora_fin'])], dtype=np.intp)
+        fila_fin[~df_clases['es_de_dos_horas'].to_numpy(dtype=bool)] = -1
+        
+        # Posicion de las columnas del laboratorio de salida, ya precalculada por laboratorio de origen
+        columna_asignatura = df_clases['laboratorio'].map(self._columna_laboratorio).to_numpy(dtype=np.intp)
+        columna_grupo = np.where(columna_asignatura >= 0, columna_asignatura + 1, -1)
+        
+        # Crear grupo con información de inscritos
+        grupo_con_inscritos = df_clases['grupo'].astype(str) + ' | Inscritos: ' + df_clases['inscritos'].astype(str)
+        
+        # Cada clase escribe en su primera hora la asignatura y el grupo con inscritos, y si es de dos horas,
+        # en la segunda hora el docente y el proyecto. Se intercalan para respetar el orden de las clases.
+        filas_escritura = np.column_stack([fila_inicio, fila_fin]).ravel()
+        columnas_asignatura = np.repeat(columna_asignatura, 2)
+        columnas_grupo = np.repeat(columna_grupo, 2)
+        valores_asignatura = np.column_stack([df_clases['asignatura'].to_numpy(dtype=object), df_clases['docente'].to_numpy(dtype=object)]).ravel()
+        valores_grupo = np.column_stack([grupo_con_inscritos.to_numpy(dtype=object), df_clases['proyecto'].to_numpy(dtype=object)]).ravel()
+        
+        # Se descartan las escrituras sin fila en el horario o de laboratorios que no estan en el orden manual
+        validas = (filas_escritura >= 0) & (columnas_asignatura >= 0)
+        filas_escritura = filas_escritura[validas]
+        
+        # Rellenar la información de las clases con una sola asignación por columna destino
+        valores[filas_escritura, columnas_asignatura[validas]] = valores_asignatura[validas]
+        valores[filas_escritura, columnas_grupo[validas]] = valores_grupo[validas]
+        
+        return pd.DataFrame(valores, columns=columnas, copy=False)
 
     def formatear_encabezados_salida(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]: #La tupla tiene el DataFrame con encabezados formateados y la lista nombres de laboratorios
         '''
         Formatea los encabezados de salida para que se vean mejor.
         '''
-        # Crear una copia para evitar modificar el original
-        df_salida = df.copy()
-        
         # Crear nuevos nombres de columna para mayor legibilidad
         nuevas_columnas = []
         nombres_laboratorios = []
         
-        for col in df_salida.columns:
+        for col in df.columns:
             if col in ['Dia', 'Hora']:
                 nuevas_columnas.append(col)
             elif col.endswith('_asignatura'):
@@ -240,134 +319,164 @@ class GeneradorHorariosLaboratorio:
                 nombre_lab = col.replace('_grupo', '')
                 nuevas_columnas.append(f'{nombre_lab} - Grupo')
         
-        df_salida.columns = nuevas_columnas
+        # Renombrar sin copiar los datos; el DataFrame original no se modifica
+        df_salida = df.set_axis(nuevas_columnas, axis=1, copy=False)
         
         return df_salida, nombres_laboratorios
 
+    def calcular_anchos_columnas(self, df: pd.DataFrame) -> List[int]:
+        '''
+        Calcula el ancho de cada columna a partir del texto más largo de la columna (incluyendo el encabezado), limitado a 50 caracteres.
+        '''
+        anchos = []
+        for i, columna in enumerate(df.columns):
+            longitud_datos = df.iloc[:, i].astype(str).str.len().max()
+            longitud_maxima = max(0 if pd.isna(longitud_datos) else int(longitud_datos), len(str(columna)))
+            anchos.append(min(longitud_maxima + 2, 50))  # Limitar a 50 caracteres
+        return anchos
+
+    def clasificar_filas(self, df: pd.DataFrame) -> List[str]:
+        '''
+        Clasifica cada fila del horario segun su formato: 'separador' (Dia y Hora vacíos), 'verde' o 'azul' alternando por pares
+        de franjas horarias, o 'sin_color' si la hora no pertenece a las franjas.
+        '''
+        es_separadora = ~df.iloc[:, 0].astype(bool) & ~df.iloc[:, 1].astype(bool)
+        indice_par = df.iloc[:, 1].map(self._indice_franja) // 2  # División entera para obtener el número de par
+        return np.select(
+            [es_separadora, indice_par % 2 == 0, indice_par % 2 == 1],
+            ['separador', 'verde', 'azul'],
+            default='sin_color'
+        ).tolist()
+
     def guardar_horario(self, df: pd.DataFrame, ruta_salida: str):
         '''
         Guarda el horario en un archivo de Excel con formato adecuado, separaciones por día y colores alternos.
+        Usa xlsxwriter si está instalado y, si no, openpyxl.
+        Si la ruta termina en .csv o .parquet se guardan solo los datos, sin formato (Parquet requiere pyarrow).
         '''
+        # Salidas sin formato para procesos automaticos: mucho mas rapidas que escribir un libro de Excel
+        extension = os.path.splitext(ruta_salida)[1].lower()
+        if extension in ('.csv', '.parquet'):
+            if extension == '.csv':
+                df.to_csv(ruta_salida, index=False, encoding='utf-8-sig') # Con BOM para que Excel reconozca las tildes
+            else:
+                df.to_parquet(ruta_salida, index=False)
+            logger.info(f'Horario guardado exitosamente en: {ruta_salida}\n')
+            return
+        
         try:
-            from openpyxl import Workbook
-            from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-            from openpyxl.utils.dataframe import dataframe_to_rows
-            
-            # Crear libro y hoja de trabajo
-            libro = Workbook()
-            hoja = libro.active
-            hoja.title = 'Horario Laboratorios'
-            
-            # Escribir el dataframe en la hoja de trabajo
-            for r in dataframe_to_rows(df, index=False, header=True):
-                hoja.append(r)
+            anchos = self.calcular_anchos_columnas(df)
+            tipos_filas = self.clasificar_filas(df)
             
-            # Definir colores y estilos
-            relleno_encabezado = PatternFill(start_color='2f2f2f', end_color='2f2f2f', fill_type='solid')
-            fuente_encabezado = Font(color='FFFFFF', bold=True)
-            relleno_separador = PatternFill(start_color='2f2f2f', end_color='2f2f2f', fill_type='solid')
-            
-            # Colores alternos para pares de filas (verde y azul)
-            relleno_verde = PatternFill(start_color='e2efda', end_color='e2efda', fill_type='solid')  # Verde claro
-            relleno_azul = PatternFill(start_color='b4c6e7', end_color='b4c6e7', fill_type='solid')   # Azul claro
-            
-            # Formatear encabezados
-            for col in range(1, hoja.max_column + 1):
-                celda = hoja.cell(row=1, column=col)
-                celda.fill = relleno_encabezado
-                celda.font = fuente_encabezado
-                celda.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Aplicar colores alternos a pares de filas y manejar separadores
-            for fila_num in range(2, hoja.max_row + 1):
-                # Comprobar si es una fila separadora (Dia y Hora vacíos)
-                celda_dia = hoja.cell(row=fila_num, column=1)
-                celda_hora = hoja.cell(row=fila_num, column=2)
-                
-                if not celda_dia.value and not celda_hora.value:
-                    # Es una fila separadora
-                    for col in range(1, hoja.max_column + 1):
-                        hoja.cell(row=fila_num, column=col).fill = relleno_separador
-                else:
-                    # Es una fila de datos normal
-                    franja_horaria = celda_hora.value
-                    
-                    if franja_horaria in self.franjas_horarias:
-                        indice_tiempo = self.franjas_horarias.index(franja_horaria)
-                        indice_par = indice_tiempo // 2  # División entera para obtener el número de par
-                        
-                        # Alternar colores para cada par
-                        color_relleno = relleno_verde if indice_par % 2 == 0 else relleno_azul
-                        
-                        for col in range(1, hoja.max_column + 1):
-                            hoja.cell(row=fila_num, column=col).fill = color_relleno
-            
-            # Añadir bordes a todas las celdas
-            borde_fino = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            
-            for fila in range(1, hoja.max_row + 1):
-                for col in range(1, hoja.max_column + 1):
-                    celda = hoja.cell(row=fila, column=col)
-                    celda.border = borde_fino
-                    celda.alignment = Alignment(
-                        horizontal='center', 
-                        vertical='center',
-                        wrap_text=True
-                    )
-            
-            # Autoajustar anchos de columna
-            for columna in hoja.columns:
-                longitud_maxima = 0
-                letra_columna = columna[0].column_letter
-                for celda in columna:
-                    try:
-                        if len(str(celda.value)) > longitud_maxima:
-                            longitud_maxima = len(str(celda.value))
-                    except:
-                        pass
-                ancho_ajustado = min(longitud_maxima + 2, 50)  # Limitar a 50 caracteres
-                hoja.column_dimensions[letra_columna].width = ancho_ajustado
-            
-            # Guardar el libro de trabajo
-            libro.save(ruta_salida)
+            if xlsxwriter is not None:
+                self._guardar_con_xlsxwriter(df, ruta_salida, anchos, tipos_filas)
+            elif _OPENPYXL_DISPONIBLE:
+                self._guardar_con_openpyxl(df, ruta_salida, anchos, tipos_filas)
+            else:
+                raise ImportError('Se requiere openpyxl o XlsxWriter para guardar el horario en Excel')
             
-            print(f'Horario guardado exitosamente en: {ruta_salida}\n')
+            logger.info(f'Horario guardado exitosamente en: {ruta_salida}\n')
             
         except Exception as e:
-            # Opción de respaldo: guardado básico con pandas si falla el formato con openpyxl
-            print(f'⚠️ Falló el formato avanzado, guardando versión básica: {str(e)}\n')
+            # Opción de respaldo: guardado básico con pandas si falla el formato
+            logger.warning(f'⚠️ Falló el formato avanzado, guardando versión básica: {str(e)}\n')
             df.to_excel(ruta_salida, index=False, sheet_name='Horario')
-            print(f'⚠️ Horario básico guardado en: {ruta_salida}\n')
+            logger.warning(f'⚠️ Horario básico guardado en: {ruta_salida}\n')
+
+    def _guardar_con_xlsxwriter(self, df: pd.DataFrame, ruta_salida: str, anchos: List[int], tipos_filas: List[str]):
+        '''
+        Escribe el horario con xlsxwriter en modo de memoria constante: cada fila se envía al archivo apenas se escribe.
+        '''
+        libro = xlsxwriter.Workbook(ruta_salida, {'constant_memory': True, 'strings_to_urls': False})
+        hoja = libro.add_worksheet('Horario Laboratorios')
+        
+        # Crear un formato por tipo de fila con relleno, bordes y alineación
+        formato_base = {'border': 1, 'align': 'center', 'valign': 'vcenter', 'text_wrap': True}
+        formatos = {tipo: libro.add_format({**formato_base, 'bg_color': f'#{color}'}) for tipo, color in self.colores_filas.items()}
+        formatos['encabezado'] = libro.add_format({**formato_base, 'bg_color': f'#{self.colores_filas['encabezado']}', 'font_color': '#FFFFFF', 'bold': True})
+        formatos['sin_color'] = libro.add_format(formato_base)
+        
+        # Autoajustar anchos de columna
+        for i, ancho in enumerate(anchos):
+            hoja.set_column(i, i, ancho)
+        
+        # Escribir encabezados y filas en orden, como exige el modo de memoria constante
+        hoja.write_row(0, 0, list(df.columns), formatos['encabezado'])
+        for num_fila, (fila, tipo) in enumerate(zip(df.itertuples(index=False), tipos_filas), start=1):
+            hoja.write_row(num_fila, 0, fila, formatos[tipo])
+        
+        libro.close()
+
+    def _guardar_con_openpyxl(self, df: pd.DataFrame, ruta_salida: str, anchos: List[int], tipos_filas: List[str]):
+        '''
+        Escribe el horario con openpyxl en modo de solo escritura: las filas se envían al archivo a medida que se agregan.
+        '''
+        libro = Workbook(write_only=True)
+        hoja = libro.create_sheet('Horario Laboratorios')
+        
+        # Bordes y alineación comunes a todas las celdas
+        borde_fino = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+        alineacion_centrada = Alignment(horizontal='center', vertical='center', wrap_text=True)
+        
+        # Registrar un estilo con nombre por tipo de fila; las celdas solo guardan el nombre
+        estilos = {}
+        for tipo in [*self.colores_filas, 'sin_color']:
+            estilo = NamedStyle(name=f'Horario {tipo}', border=borde_fino, alignment=alineacion_centrada)
+            color = self.colores_filas.get(tipo)
+            estilo.fill = PatternFill(start_color=color, end_color=color, fill_type='solid') if color else PatternFill()
+            estilo.font = Font(color='FFFFFF', bold=True) if tipo == 'encabezado' else DEFAULT_FONT
+            libro.add_named_style(estilo)
+            estilos[tipo] = estilo.name
+        
+        def crear_celda(valor, estilo):
+            celda = WriteOnlyCell(hoja, value=valor)
+            celda.style = estilo
+            return celda
+        
+        # Autoajustar anchos de columna (en modo de solo escritura deben definirse antes de las filas)
+        for i, ancho in enumerate(anchos, start=1):
+            hoja.column_dimensions[get_column_letter(i)].width = ancho
+        
+        # Escribir los encabezados y luego las filas con el estilo ya resuelto
+        hoja.append([crear_celda(columna, estilos['encabezado']) for columna in df.columns])
+        for fila, tipo in zip(df.itertuples(index=False), tipos_filas):
+            hoja.append([crear_celda(valor, estilos[tipo]) for valor in fila])
+        
+        # Guardar el libro de trabajo
+        libro.save(ruta_salida)
 
-    def generar_horario(self, archivo_entrada: str, archivo_salida: str):
+    def generar_horario(self, archivo_entrada: str, archivo_salida: str, nrows: int = None):
         '''
         Este es el metodo principal para generar el horario completo.
+        Con 'nrows' solo se procesan los primeros registros del reporte de entrada.
         '''
-        print(f'___\nArchivo de entrada: {archivo_entrada}\n')
-        print(f'Archivo de salida: {archivo_salida}\n')
-        print(f'Mapeos de laboratorio: {self.mapeo_laboratorios}\n___\n')
+        logger.info(f'___\nArchivo de entrada: {archivo_entrada}\n')
+        logger.info(f'Archivo de salida: {archivo_salida}\n')
+        if self.verbose:
+            logger.info(f'Mapeos de laboratorio: {self.mapeo_laboratorios}\n')
+        logger.info('___\n')
         
         try:
             # Paso 1: Leer el reporte de ocupación
-            df = self.leer_reporte_ocupacion(archivo_entrada)
+            df = self.leer_reporte_ocupacion(archivo_entrada, nrows=nrows)
             
             # Paso 2: Filtrar por laboratorios mapeados
             df_filtrado = self.filtrar_laboratorios_mapeados(df)
             
             if df_filtrado.empty:
-                print('⚠️ Advertencia: ¡No se encontraron datos para los laboratorios mapeados!\n')
+                logger.warning('⚠️ Advertencia: ¡No se encontraron datos para los laboratorios mapeados!\n')
                 return
             
             # Paso 3: Agrupar horas consecutivas en clases
             clases = self.agrupar_horas_consecutivas(df_filtrado)
             
-            if not clases:
-                print('⚠️ Advertencia: ¡No se encontraron sesiones de clase completas!\n')
+            if clases.empty:
+                logger.warning('⚠️ Advertencia: ¡No se encontraron sesiones de clase completas!\n')
                 return
             
             # Paso 4: Crear la matriz del horario
@@ -379,13 +488,16 @@ class GeneradorHorariosLaboratorio:
             # Paso 6: Guardar la salida
             self.guardar_horario(df_formateado, archivo_salida)
             
-            print('¡La generación de horarios de laboratorio se completó exitosamente!\n')
+            logger.info('¡La generación de horarios de laboratorio se completó exitosamente!\n')
             
         except Exception as e:
-            print(f'⚠️ Error durante la generación del horario: {str(e)}\n')
+            logger.error(f'⚠️ Error durante la generación del horario: {str(e)}\n')
             raise
 
 def main():
+    # Mostrar los mensajes de progreso en la consola tal como se escriben
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     # Definicion de laboratorios
     config_mapeo_laboratorios = {
         'LABORATORIO GEIO CAP(25)': 'GEIO (321) TECHNE',
@@ -414,16 +526,8 @@ def main():
         'Inscritos', 'Docente'
     ]
     
-    # Crear la instancia de la clase
-    generador = GeneradorHorariosLaboratorio( # añadir 'orden_laboratorios: List[str]' como argumento para organizacion manual
-        mapeo_laboratorios=config_mapeo_laboratorios,
-        dias=config_dias,
-        franjas_horarias=config_franjas_horarias,
-        columnas_entrada=config_columnas_entrada,
-        #orden_laboratorios=config_orden_laboratorios # Pasar la nueva lista de orden
-    )
-    
     # OPCIONAL: para definir en que orden se organizaran los laboratorios en el horario final
+    # (por defecto se usa el orden en que aparecen en el mapeo)
     # config_orden_laboratorios = [
     #     'GEIO (321) TECHNE',
     #     'Sala de Software A - 16 EST - 416- TECHNE',
@@ -432,6 +536,16 @@ def main():
     #     'FMS-200 (320) TECHNE',
     #     'LABORATORIO DE PROCESOS DE TRANSFORMACIÓN BLOQUE 1-102'
     # ]
+    
+    # Crear la instancia de la clase
+    generador = GeneradorHorariosLaboratorio(
+        mapeo_laboratorios=config_mapeo_laboratorios,
+        dias=config_dias,
+        franjas_horarias=config_franjas_horarias,
+        columnas_entrada=config_columnas_entrada,
+        verbose=True,
+        #orden_laboratorios=config_orden_laboratorios # Pasar la nueva lista de orden
+    )
         
     # Rutas de los archivos
     archivo_entrada = 'reporte_ocupacion.xlsx'
@@ -440,7 +554,7 @@ def main():
     try:
         generador.generar_horario(archivo_entrada, archivo_salida)
     except Exception as e:
-        print(f'⚠️ Falló la generación del horario: {str(e)}\n')
+        logger.error(f'⚠️ Falló la generación del horario: {str(e)}\n')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file